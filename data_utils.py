@@ -1,5 +1,14 @@
 import pandas as pd
+import os
+import re
 import json
+import orjson
+
+#version of the processed data cached by read_data_from_file - increase this whenever
+#process_json_data changes so caches built by older code are not reused
+CACHE_VERSION = 1
+#tables cached by read_data_from_file, in the order process_json_data returns them
+CACHE_TABLES = ('orders', 'payment_methods', 'transactions', 'customers')
 
 def process_json_data(json_data):
     
@@ -21,45 +30,106 @@ def process_json_data(json_data):
     """
 
 
-    #initialising empty lists
-    orders_list = []
-    payment_methods_list = []
-    transactions_list = []
-    customers_list = []
-
-    for data in json_data:
-        customer_key = data['customer']['customerEmail']  #customer email = unique key
-        #orders
-        for order in data.get('orders', []):
-            order['customerEmail'] = customer_key
-            orders_list.append(order)
-        #payment methods
-        for payment_method in data.get('paymentMethods', []):
-            payment_method['customerEmail'] = customer_key
-            payment_methods_list.append(payment_method)
-        #transactions
-        for transaction in data.get('transactions', []):
-            transaction['customerEmail'] = customer_key
-            transactions_list.append(transaction)
-        #customers
-        customer = data['customer']
-        customer['fraudulent'] = data['fraudulent']
-        customers_list.append(customer)
-
-    #putting everything into dataframes
-    df_orders = pd.DataFrame(orders_list)
-    df_payment_methods = pd.DataFrame(payment_methods_list)
-    df_transactions = pd.DataFrame(transactions_list)
-    df_customers = pd.DataFrame(customers_list)
+    #json_normalize needs every record to have each record path, so customers without
+    #orders, payment methods or transactions are given empty lists
+    record_paths = ('orders', 'paymentMethods', 'transactions')
+    json_data = [{**data, **{path: data.get(path) or [] for path in record_paths}} for data in json_data]
+
+    #flattening each list of records into a dataframe, carrying the customer email (unique key) with every row
+    email_meta = [['customer', 'customerEmail']]
+    email_column = {'customer.customerEmail': 'customerEmail'}
+    #orders
+    df_orders = pd.json_normalize(json_data, record_path='orders', meta=email_meta).rename(columns=email_column)
+    #payment methods
+    df_payment_methods = pd.json_normalize(json_data, record_path='paymentMethods', meta=email_meta).rename(columns=email_column)
+    #transactions
+    df_transactions = pd.json_normalize(json_data, record_path='transactions', meta=email_meta).rename(columns=email_column)
+
+    #customers - flattening one level gives the customer fields as 'customer.x' columns alongside the fraud status
+    df_customers = pd.json_normalize(json_data, max_level=1)
+    customer_columns = [col for col in df_customers.columns if col.startswith('customer.')]
+    customer_columns += [col for col in ['fraudulent'] if col in df_customers.columns]
+    df_customers = df_customers[customer_columns].rename(columns=lambda col: col.removeprefix('customer.'))
+
+    return set_customer_email_dtype(df_orders, df_payment_methods, df_transactions, df_customers)
+
+
+def set_customer_email_dtype(df_orders, df_payment_methods, df_transactions, df_customers):
+
+    """
+    Converts the customerEmail column of all four DataFrames to a single categorical
+    dtype built from the customer emails, so grouping and aligning on it works on
+    integer codes rather than hashing strings.
+
+    Args:
+    df_orders (pandas.DataFrame): DataFrame containing order details.
+    df_payment_methods (pandas.DataFrame): DataFrame containing payment method details.
+    df_transactions (pandas.DataFrame): DataFrame containing transaction details.
+    df_customers (pandas.DataFrame): DataFrame containing customer details.
+
+    Returns:
+    tuple: The same four DataFrames with a shared categorical customerEmail column.
+    """
+
+
+    email_dtype = pd.CategoricalDtype(df_customers['customerEmail'].dropna().astype(object).unique())
+    for df in (df_orders, df_payment_methods, df_transactions, df_customers):
+        df['customerEmail'] = df['customerEmail'].astype(email_dtype)
 
     return df_orders, df_payment_methods, df_transactions, df_customers
 
 
+def write_data_cache(dataframes, cache_paths, filepath):
+
+    """
+    Writes the processed DataFrames to Parquet cache files, then removes any caches
+    left from earlier versions of the input file. Each file is written to a temporary
+    path and moved into place, so an interrupted run never leaves a partial cache.
+    If the cache can't be written (e.g. a read-only data directory, or a column whose
+    mixed types Parquet can't store) it is skipped and any files already written are removed.
+
+    Args:
+    dataframes (tuple of pandas.DataFrame): The DataFrames returned by `process_json_data`.
+    cache_paths (list of str): Cache file path for each DataFrame.
+    filepath (str): Path to the input file the DataFrames were read from.
+    """
+
+
+    written_paths = []
+    try:
+        for df, cache_path in zip(dataframes, cache_paths):
+            temp_path = f'{cache_path}.tmp'
+            written_paths += [temp_path, cache_path]
+            df.to_parquet(temp_path, compression='zstd')
+            os.replace(temp_path, cache_path)
+    except (OSError, ValueError, TypeError):
+        #carrying on without a cache, tidying up every file written so far so no partial cache is left
+        #(pyarrow raises ValueError/TypeError for object columns holding mixed types)
+        for path in written_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        return
+
+    #removing caches from earlier versions of the file (or of the code) - the name has to match the
+    #exact cache shape so caches of other inputs whose name starts with this one (e.g. 'customers.json.old') are kept
+    cache_directory, filename = os.path.split(filepath)
+    old_cache_pattern = re.compile(rf'{re.escape(filename)}\.v\d+-\d+-\d+\.({"|".join(CACHE_TABLES)})\.cache\.parquet')
+    current_names = [os.path.basename(cache_path) for cache_path in cache_paths]
+    try:
+        for name in os.listdir(cache_directory or '.'):
+            if old_cache_pattern.fullmatch(name) and name not in current_names:
+                os.remove(os.path.join(cache_directory, name))
+    except OSError:
+        pass
+
+
 def read_data_from_file(filepath):
 
     """
     Reads JSON objects from a file located at the specified path and processes
-    the data using the `process_json_data` function.
+    the data using the `process_json_data` function. The processed DataFrames are
+    cached next to the file as Parquet, keyed on CACHE_VERSION and the file's
+    modification time and size, so repeated runs on unchanged data skip the parsing.
 
     Args:
     filepath (str): Path to the file containing JSON objects.
@@ -70,13 +140,21 @@ def read_data_from_file(filepath):
     """
 
 
-    #opening JSON file in read mode and reading lines
-    with open(filepath, 'r') as f:
-        data = f.readlines()
+    #loading the dataframes from the cache if this version of the file has been processed before
+    #(Parquet doesn't keep one categorical dtype across separate files, so the shared dtype is re-applied)
+    file_stat = os.stat(filepath)
+    cache_key = f'v{CACHE_VERSION}-{file_stat.st_mtime_ns}-{file_stat.st_size}'
+    cache_paths = [f'{filepath}.{cache_key}.{name}.cache.parquet' for name in CACHE_TABLES]
+    if all(os.path.exists(cache_path) for cache_path in cache_paths):
+        return set_customer_email_dtype(*[pd.read_parquet(cache_path) for cache_path in cache_paths])
+
+    #opening JSON file in binary mode and parsing each non-empty line as it is read
+    #(orjson parses the raw bytes directly, so the file is never held in memory as a list of strings)
+    with open(filepath, 'rb') as f:
+        json_objects = [orjson.loads(line) for line in f if line.strip()]
 
-    data = [line.strip() for line in data if line.strip()] #stripping newlines and spaces, and filter out empty lines
-    json_objects = [json.loads(line) for line in data] #parses each JSON object in the file
     df_orders, df_payment_methods, df_transactions, df_customers = process_json_data(json_objects)
+    write_data_cache((df_orders, df_payment_methods, df_transactions, df_customers), cache_paths, filepath)
 
     return df_orders, df_payment_methods, df_transactions, df_customers
 
@@ -96,133 +174,94 @@ def df_customers_features(df_customers):
     """
 
 
-    #group by customerEmail and using transform to assign the count to a new column
-    df_customers['EmailCount'] = df_customers.groupby('customerEmail')['customerEmail'].transform('count')
-
-    #getting value counts, those that appear more than once will have value_counts > 1
-    duplicate_addresses = df_customers['customerBillingAddress'].value_counts()
-    duplicate_addresses = duplicate_addresses[duplicate_addresses > 1].index
-
-    #create a boolean column - 'isin' means will be true if in above df (ie appears more than once)
-    df_customers['IsBillingAddressShared'] = df_customers['customerBillingAddress'].isin(duplicate_addresses)
+    #create a boolean column - keep=False marks every occurrence of a repeated address, not just the later ones
+    #(missing addresses are never counted as shared)
+    billing_address = df_customers['customerBillingAddress']
+    df_customers['IsBillingAddressShared'] = billing_address.duplicated(keep=False) & billing_address.notna()
 
-    #dropping cols
+    #dropping cols before any further work so they aren't copied through the rest of the pipeline
     df_customers = df_customers.drop(columns=['customerPhone', 'customerDevice', 'customerIPAddress','customerBillingAddress'])
 
+    #group by customerEmail and using transform to get the group size, inserted ahead of
+    #IsBillingAddressShared to keep the column order the model was trained with
+    #(dropna=False so customers with a missing email are counted together rather than left as nan)
+    email_count = df_customers.groupby('customerEmail', sort=False, observed=True, dropna=False)['customerEmail'].transform('size')
+    df_customers.insert(df_customers.columns.get_loc('IsBillingAddressShared'), 'EmailCount', email_count)
+
     return df_customers
 
 
 def df_orders_features(df_orders, df_customers):
 
-    #calculating total number of orders for each customer and giving new column name
-    order_counts = df_orders.groupby('customerEmail').size().reset_index(name='TotalOrders')
-    #merging above count with df_customers dataframe (left join returns all the rows from the 'left' df along with the matched
-    #rows from the 'right' df, so will contain counts as new column for each user) with name from before
-    df_customers = df_customers.merge(order_counts, on='customerEmail', how='left')
-    #replace nan with 0
-    df_customers['TotalOrders'].fillna(0, inplace=True)
-
-    #ensuring customerEmail is the same type in both dfs to avoid confusion when using it as a key
-    df_orders['customerEmail'] = df_orders['customerEmail'].astype(str)
-    df_customers['customerEmail'] = df_customers['customerEmail'].astype(str)
-
-    #calculating average order amount for each customer
-    average_order_amount = df_orders.groupby('customerEmail')['orderAmount'].mean().reset_index(name='AverageOrderAmount')
-    #merging like before
-    df_customers = df_customers.merge(average_order_amount, on='customerEmail', how='left')
-    df_customers['AverageOrderAmount'].fillna(0, inplace=True)
-
-    #total number of failed orders for each customer using same methods as before
-    failed_orders = df_orders[df_orders['orderState'] == 'failed'].groupby('customerEmail').size().reset_index(name='FailedOrders')
-    df_customers = df_customers.merge(failed_orders, on='customerEmail', how='left')
-    df_customers['FailedOrders'].fillna(0, inplace=True)
-    #calculating ratio of failed orders to total orders
-    df_customers['FailedOrderRatio'] = df_customers['FailedOrders'] / df_customers['TotalOrders']
-    #replace NaN values (from division by zero) with 0
-    df_customers['FailedOrderRatio'].fillna(0, inplace=True)
-
-    #counting unique order shipping addresses for each customer
-    unique_shipping_addresses = df_orders.groupby('customerEmail')['orderShippingAddress'].nunique().reset_index(name='UniqueShippingAddresses')
-    df_customers = df_customers.merge(unique_shipping_addresses, on='customerEmail', how='left')
-    df_customers['UniqueShippingAddresses'].fillna(0, inplace=True)
+    #keeping only the columns used below so the groupby doesn't carry the rest of the raw order fields
+    df_orders = df_orders[['customerEmail', 'orderAmount', 'orderState', 'orderShippingAddress']]
+
+    #calculating total number of orders, average order amount, number of failed orders and number of unique
+    #shipping addresses for each customer in a single groupby
+    order_features = df_orders.assign(_failed=(df_orders['orderState'] == 'failed')).groupby('customerEmail', sort=False, observed=True).agg(
+        TotalOrders=('orderAmount', 'size'),
+        AverageOrderAmount=('orderAmount', 'mean'),
+        FailedOrders=('_failed', 'sum'),
+        UniqueShippingAddresses=('orderShippingAddress', 'nunique'),
+    )
+    #calculating ratio of failed orders to total orders (every customer in the groupby has at least one order)
+    order_features.insert(3, 'FailedOrderRatio', order_features['FailedOrders'] / order_features['TotalOrders'])
+
+    #df_customers and the aggregate are both indexed by customerEmail, so the features are aligned onto
+    #df_customers by reindexing (a customer can appear more than once) and concatenated without a merge
+    #customers without orders are left as nan and filled in get_feature_matrix
+    order_features = order_features.reindex(df_customers.index)
+    df_customers = pd.concat([df_customers, order_features], axis=1)
 
     return df_customers
 
 
 def df_payment_methods_features(df_payment_methods, df_customers):
 
-    #similar code used to previous cells
-    df_payment_methods['customerEmail'] = df_payment_methods['customerEmail'].astype(str)
-
-    #making mask for each payment method type
-    card_mask = df_payment_methods['paymentMethodType'] == 'card'
-    apple_pay_mask = df_payment_methods['paymentMethodType'] == 'apple pay'
-    paypal_mask = df_payment_methods['paymentMethodType'] == 'paypal'
-    bitcoin_mask = df_payment_methods['paymentMethodType'] == 'bitcoin'
-
-    #grouping by customerEmail and checking if any are True for each payment type
-    card_present = df_payment_methods[card_mask].groupby('customerEmail')['paymentMethodType'].any()
-    apple_pay_present = df_payment_methods[apple_pay_mask].groupby('customerEmail')['paymentMethodType'].any()
-    paypal_present = df_payment_methods[paypal_mask].groupby('customerEmail')['paymentMethodType'].any()
-    bitcoin_present = df_payment_methods[bitcoin_mask].groupby('customerEmail')['paymentMethodType'].any()
-
-    #convert series to dfs
-    card_df = card_present.to_frame(name='HasCard')
-    apple_pay_df = apple_pay_present.to_frame(name='HasApplePay')
-    paypal_df = paypal_present.to_frame(name='HasPaypal')
-    bitcoin_df = bitcoin_present.to_frame(name='HasBitcoin')
-
-    #merging and filling nulls as before
-    df_customers = df_customers.merge(card_df, on='customerEmail', how='left')
-    df_customers = df_customers.merge(apple_pay_df, on='customerEmail', how='left')
-    df_customers = df_customers.merge(paypal_df, on='customerEmail', how='left')
-    df_customers = df_customers.merge(bitcoin_df, on='customerEmail', how='left')
-    df_customers['HasCard'].fillna(False, inplace=True)
-    df_customers['HasApplePay'].fillna(False, inplace=True)
-    df_customers['HasPaypal'].fillna(False, inplace=True)
-    df_customers['HasBitcoin'].fillna(False, inplace=True)
-
-    #count the unique payment method types for each customer, same code as before
-    unique_payment_types = df_payment_methods.groupby('customerEmail')['paymentMethodType'].nunique().reset_index(name='UniquePaymentMethodTypes')
-    df_customers = df_customers.merge(unique_payment_types, on='customerEmail', how='left')
-    df_customers['UniquePaymentMethodTypes'].fillna(0, inplace=True)
-
-    #unique payment method IDs for each customer, same code
-    unique_payment_methods = df_payment_methods.groupby('customerEmail')['paymentMethodId'].nunique().reset_index(name='NumberOfUniquePaymentMethods')
-    df_customers = df_customers.merge(unique_payment_methods, on='customerEmail', how='left')
-    df_customers['NumberOfUniquePaymentMethods'].fillna(0, inplace=True)
-
-    #filtering for payment registration failures and counting them for each customer
-    payment_failures = df_payment_methods[df_payment_methods['paymentMethodRegistrationFailure'] == True].groupby('customerEmail').size().reset_index(name='PaymentRegistrationFailures')
-    #merging etc and finding ratio same as before
-    df_customers = df_customers.merge(payment_failures, on='customerEmail', how='left')
-    df_customers['PaymentRegistrationFailures'].fillna(0, inplace=True)
-    df_customers['FailureRatio'] = df_customers['PaymentRegistrationFailures'] / df_customers['NumberOfUniquePaymentMethods']
-    df_customers['FailureRatio'].fillna(0, inplace=True)
+    #keeping only the columns used below, as for orders
+    df_payment_methods = df_payment_methods[['customerEmail', 'paymentMethodType', 'paymentMethodId', 'paymentMethodRegistrationFailure']]
+
+    #cross tabulating customerEmail against payment method type, so a count > 0 means the customer has that type
+    #reindexing guarantees all four flag columns exist even if a type is missing from the data
+    payment_types = {'card': 'HasCard', 'apple pay': 'HasApplePay', 'paypal': 'HasPaypal', 'bitcoin': 'HasBitcoin'}
+    payment_flags = pd.crosstab(df_payment_methods['customerEmail'], df_payment_methods['paymentMethodType']) > 0
+    payment_flags = payment_flags.reindex(columns=list(payment_types), fill_value=False).rename(columns=payment_types)
+
+    #counting unique payment method types, unique payment method IDs and registration failures for each customer
+    payment_features = df_payment_methods.assign(_failed=(df_payment_methods['paymentMethodRegistrationFailure'] == True)).groupby('customerEmail', sort=False, observed=True).agg(
+        UniquePaymentMethodTypes=('paymentMethodType', 'nunique'),
+        NumberOfUniquePaymentMethods=('paymentMethodId', 'nunique'),
+        PaymentRegistrationFailures=('_failed', 'sum'),
+    )
+    #finding ratio same as before
+    payment_features['FailureRatio'] = payment_features['PaymentRegistrationFailures'] / payment_features['NumberOfUniquePaymentMethods']
+
+    #aligning as before - flags are filled with False here so they stay boolean, while the
+    #counts are left as nan for get_feature_matrix to fill
+    payment_flags = payment_flags.reindex(df_customers.index, fill_value=False)
+    payment_features = payment_features.reindex(df_customers.index)
+    df_customers = pd.concat([df_customers, payment_flags, payment_features], axis=1)
 
     return df_customers
 
 
 def df_transactions_features(df_transactions, df_customers):
 
-    #using same code as before to count transactions, calculate averages and totals for each email adress
-    df_transactions['customerEmail'] = df_transactions['customerEmail'].astype(str)
-
-    transaction_counts = df_transactions.groupby('customerEmail').size().reset_index(name='NumberOfTransactions')
-    average_transaction_amount = df_transactions.groupby('customerEmail')['transactionAmount'].mean().reset_index(name='AverageTransactionAmount')
-    failed_transaction_counts = df_transactions[df_transactions['transactionFailed'] == True].groupby('customerEmail').size().reset_index(name='NumberOfFailedTransactions')
-
-    #merging and filling nans
-    df_customers = df_customers.merge(transaction_counts, on='customerEmail', how='left')
-    df_customers = df_customers.merge(average_transaction_amount, on='customerEmail', how='left')
-    df_customers = df_customers.merge(failed_transaction_counts, on='customerEmail', how='left')
-    df_customers['NumberOfTransactions'].fillna(0, inplace=True)
-    df_customers['AverageTransactionAmount'].fillna(0, inplace=True)
-    df_customers['NumberOfFailedTransactions'].fillna(0, inplace=True)
+    #keeping only the columns used below, as for orders
+    df_transactions = df_transactions[['customerEmail', 'transactionAmount', 'transactionFailed']]
 
+    #using same approach as for orders to count transactions, calculate averages and failed totals for each email adress
+    transaction_features = df_transactions.assign(_failed=(df_transactions['transactionFailed'] == True)).groupby('customerEmail', sort=False, observed=True).agg(
+        NumberOfTransactions=('transactionAmount', 'size'),
+        AverageTransactionAmount=('transactionAmount', 'mean'),
+        NumberOfFailedTransactions=('_failed', 'sum'),
+    )
     #calculating ratio same as before
-    df_customers['FailedTransactionFraction'] = df_customers['NumberOfFailedTransactions'] / df_customers['NumberOfTransactions']
-    df_customers['FailedTransactionFraction'].fillna(0, inplace=True)
+    transaction_features['FailedTransactionFraction'] = transaction_features['NumberOfFailedTransactions'] / transaction_features['NumberOfTransactions']
+
+    #aligning as before
+    transaction_features = transaction_features.reindex(df_customers.index)
+    df_customers = pd.concat([df_customers, transaction_features], axis=1)
 
     return df_customers
 
@@ -240,16 +279,15 @@ def feature_matrix_cleaning(df_customers):
     tuple: A cleaned DataFrame and a list of customer emails.
     """
 
-    #converting boolean columns to integers
+    #converting boolean columns to small integers in a single cast ('fraudulent' is absent from unlabelled data)
     bool_columns = ['IsBillingAddressShared', 'HasCard', 'HasApplePay', 'HasPaypal', 'HasBitcoin', 'fraudulent']
-    for col in bool_columns:
-        df_customers[col] = df_customers[col].astype(int)
+    df_customers = df_customers.astype({col: 'int8' for col in bool_columns if col in df_customers.columns})
 
     #getting the user emails as a list for use later
-    user_emails = df_customers['customerEmail'].tolist()
+    user_emails = df_customers.index.tolist()
 
-    #dropping email column
-    df_customers = df_customers.drop('customerEmail', axis=1)
+    #dropping email index
+    df_customers = df_customers.reset_index(drop=True)
 
     return df_customers, user_emails
 
@@ -270,10 +308,25 @@ def get_feature_matrix(df_orders, df_payment_methods, df_transactions, df_custom
     tuple: A final feature matrix and a list of user emails.
     """
 
-    df_customers = df_customers_features(df_customers)
-    df_customers = df_orders_features(df_orders, df_customers)
-    df_customers = df_payment_methods_features(df_payment_methods, df_customers)
-    df_customers = df_transactions_features(df_transactions, df_customers)
+    #default values for customers with no orders, payment methods or transactions (payment flags are already filled)
+    fill_values = {
+        'TotalOrders': 0, 'AverageOrderAmount': 0, 'FailedOrders': 0, 'FailedOrderRatio': 0, 'UniqueShippingAddresses': 0,
+        'UniquePaymentMethodTypes': 0, 'NumberOfUniquePaymentMethods': 0, 'PaymentRegistrationFailures': 0, 'FailureRatio': 0,
+        'NumberOfTransactions': 0, 'AverageTransactionAmount': 0, 'NumberOfFailedTransactions': 0, 'FailedTransactionFraction': 0,
+    }
+
+    #customerEmail is used as the index so every feature table can be aligned on it directly,
+    #and all missing values are filled in a single pass at the end
+    df_customers = (
+        df_customers_features(df_customers)
+        .set_index('customerEmail')
+        .pipe((df_orders_features, 'df_customers'), df_orders)
+        .pipe((df_payment_methods_features, 'df_customers'), df_payment_methods)
+        .pipe((df_transactions_features, 'df_customers'), df_transactions)
+        .fillna(fill_values)
+    )
+    #every customer should have a full row, with zeros for any activity they don't have
+    assert not df_customers.isna().any().any(), "Error: feature matrix contains missing values"
     df_customers, user_emails = feature_matrix_cleaning(df_customers)
 
     return df_customers, user_emails
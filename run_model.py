@@ -1,6 +1,8 @@
 from data_utils import *
 from model_utils import *
 from joblib import load
+import numpy as np
+import orjson
 
 import warnings
 warnings.filterwarnings('ignore')
@@ -22,17 +24,17 @@ if 'fraudulent' in feature_matrix.columns:
 else:
     pass
 
-#running the model to predict
-y_pred = prediction_func(classifier, X).tolist()
-y_pred_label = ['Fraudulent' if x == 1 else 'Not fraudulent' for x in y_pred]
+#running the model to predict and labelling the predictions in one vectorised step
+y_pred_label = np.where(prediction_func(classifier, X) == 1, 'Fraudulent', 'Not fraudulent')
 
 # Assert that y_pred and user_emails are the same length
 assert len(y_pred_label) == len(user_emails), "Error: y_pred and user_emails are not the same length"
 
 # Save a JSON file with user_emails as keys and corresponding y_pred as values
-email_prediction_dict = dict(zip(user_emails, y_pred_label))
-with open(f'{config["output_filename"]}.json', 'w') as file:
-    json.dump(email_prediction_dict, file)
+#orjson serialises straight to UTF-8 bytes, OPT_NON_STR_KEYS writes a customer with a missing email under a "null" key
+email_prediction_dict = dict(zip(user_emails, y_pred_label.tolist()))
+with open(f'{config["output_filename"]}.json', 'wb') as file:
+    file.write(orjson.dumps(email_prediction_dict, option=orjson.OPT_NON_STR_KEYS))
 
 print("Output JSON file has been saved.")
 
@@ -0,0 +1,59 @@
+import json
+import os
+
+from data_utils import read_data_from_file, get_feature_matrix
+
+
+def write_customers(path, records):
+
+    #writing records in the same one-JSON-object-per-line format as data/customers.json
+    with open(path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def load_customers():
+
+    with open(os.path.join(os.path.dirname(__file__), 'data', 'customers.json')) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_mixed_type_field_skips_cache(tmp_path):
+
+    #an int among string phone numbers and order IDs can't be stored as Parquet,
+    #so the data should still be read, just without leaving any cache files behind
+    records = load_customers()
+    records[2]['customer']['customerPhone'] = 5551234
+    records[5]['orders'][0]['orderId'] = 12345
+    filepath = tmp_path / 'customers.json'
+    write_customers(filepath, records)
+
+    feature_matrix, user_emails = get_feature_matrix(*read_data_from_file(str(filepath)))
+
+    assert feature_matrix.shape == (len(records), 20)
+    assert os.listdir(tmp_path) == ['customers.json']
+
+
+def test_stale_caches_removed_without_touching_sibling_inputs(tmp_path):
+
+    #re-reading an edited file should replace its own cache, while the cache of
+    #'customers.json.old', whose name starts with 'customers.json', is left alone
+    records = load_customers()
+    filepath = tmp_path / 'customers.json'
+    sibling_filepath = tmp_path / 'customers.json.old'
+    write_customers(filepath, records)
+    write_customers(sibling_filepath, records)
+
+    read_data_from_file(str(sibling_filepath))
+    sibling_caches = {name for name in os.listdir(tmp_path) if name.startswith('customers.json.old.')}
+    read_data_from_file(str(filepath))
+    first_caches = {name for name in os.listdir(tmp_path) if name not in sibling_caches} - {'customers.json', 'customers.json.old'}
+
+    os.utime(filepath, ns=(1, 1))
+    read_data_from_file(str(filepath))
+    caches = set(os.listdir(tmp_path)) - {'customers.json', 'customers.json.old'}
+
+    assert len(sibling_caches) == 4 and len(first_caches) == 4
+    assert sibling_caches <= caches
+    assert not first_caches & caches
+    assert len(caches) == 8
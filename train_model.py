@@ -16,5 +16,6 @@ feature_matrix, user_emails = get_feature_matrix(df_orders, df_payment_methods,
 classifier = create_model(feature_matrix)
 
 modelname = f'{config["model_name"]}.joblib'
-dump(classifier, modelname)
+#compressing the saved model to cut its size on disk and the I/O needed to load it in run_model.py
+dump(classifier, modelname, compress=('zlib', 3))
 print('Model saved as', modelname)
\ No newline at end of file